@@ -0,0 +1,376 @@
+import struct
+
+# --- 容器头部解析 ---
+# 常见的 MP4/MOV 与 MKV/WebM 文件直接读取容器头部，得到与 FFprobe JSON 结构相同的数据，
+# 无需启动子进程。遇到无法确定结果的情况一律返回 None，由调用方回退到 FFprobe。
+
+# ISO BMFF (MP4/MOV) 采样描述 fourcc -> FFprobe codec_name
+_MP4_CODECS = {
+    b'avc1': 'h264',
+    b'avc3': 'h264',
+    b'hvc1': 'hevc',
+    b'hev1': 'hevc',
+    b'av01': 'av1',
+    b'vp09': 'vp9',
+    b'ac-3': 'ac3',
+    b'ec-3': 'eac3',
+    b'Opus': 'opus',
+    b'fLaC': 'flac',
+    b'alac': 'alac',
+}
+# mp4a 采样描述中 esds 的 objectTypeIndication -> FFprobe codec_name
+_MP4A_OBJECT_TYPES = {
+    0x40: 'aac',
+    0x66: 'aac',
+    0x67: 'aac',
+    0x68: 'aac',
+    0x69: 'mp3',
+    0x6B: 'mp3',
+}
+_MP4_HANDLERS = {b'vide': 'video', b'soun': 'audio'}
+
+# Matroska CodecID -> FFprobe codec_name
+_MKV_CODECS = {
+    'V_MPEG4/ISO/AVC': 'h264',
+    'V_MPEGH/ISO/HEVC': 'hevc',
+    'V_VP8': 'vp8',
+    'V_VP9': 'vp9',
+    'V_AV1': 'av1',
+    'A_AAC': 'aac',
+    'A_OPUS': 'opus',
+    'A_VORBIS': 'vorbis',
+    'A_AC3': 'ac3',
+    'A_EAC3': 'eac3',
+    'A_FLAC': 'flac',
+    'A_MPEG/L3': 'mp3',
+}
+_MKV_TRACK_TYPES = {1: 'video', 2: 'audio'}
+
+# Matroska 元素 ID
+_EBML = 0x1A45DFA3
+_SEGMENT = 0x18538067
+_INFO = 0x1549A966
+_TIMECODE_SCALE = 0x2AD7B1
+_DURATION = 0x4489
+_TRACKS = 0x1654AE6B
+_TRACK_ENTRY = 0xAE
+_TRACK_TYPE = 0x83
+_CODEC_ID = 0x86
+_VIDEO = 0xE0
+_PIXEL_WIDTH = 0xB0
+_PIXEL_HEIGHT = 0xBA
+_AUDIO = 0xE1
+_SAMPLING_FREQUENCY = 0xB5
+_CHANNELS = 0x9F
+_CLUSTER = 0x1F43B675
+
+# 上传内容不可信，限制纯 Python 遍历的工作量；超出限制时返回 None，
+# 由 FFprobe 处理（它在独立进程中运行，受 FFPROBE_SEM 和 FFPROBE_TIMEOUT 约束）
+# MKV 的 Info/Tracks 位于文件开头，只在这个窗口内查找
+_MKV_HEADER_WINDOW = 1024 * 1024
+# 每一层最多遍历的 box/元素数量
+_MAX_CHILDREN = 1000
+
+
+class _LimitExceeded(ValueError):
+    """同一层的 box/元素数量超过 _MAX_CHILDREN。"""
+
+
+def probe_container(stream):
+    """解析 MP4/MOV 或 MKV/WebM 的容器头部，返回与 FFprobe JSON 结构相同的字典。
+
+    stream 必须可 seek；读取完成后位置不做保证。无法识别或遇到不支持的编码时返回 None。
+    """
+    stream.seek(0, 2)
+    size = stream.tell()
+    stream.seek(0)
+    head = stream.read(8)
+    try:
+        if head[4:8] == b'ftyp':
+            data = _probe_mp4(stream, size)
+        elif head[:4] == struct.pack('>I', _EBML):
+            data = _probe_mkv(stream, min(size, _MKV_HEADER_WINDOW))
+        else:
+            return None
+    except (struct.error, ValueError, IndexError, UnicodeDecodeError):
+        return None
+
+    if not data or not data['streams'] or data['format']['duration'] <= 0:
+        return None
+    # 与 FFprobe 一致：码率由文件大小和时长估算
+    data['format']['size'] = size
+    data['format']['bit_rate'] = int(size * 8 / data['format']['duration'])
+    return data
+
+# --- MP4 / MOV ---
+
+def _iter_boxes(f, start, end):
+    """遍历 [start, end) 范围内的 box，产出 (类型, 数据起点, 数据终点)。"""
+    pos = start
+    for _ in range(_MAX_CHILDREN):
+        if pos + 8 > end:
+            return
+        f.seek(pos)
+        size, box_type = struct.unpack('>I4s', f.read(8))
+        header_size = 8
+        if size == 1:
+            size = struct.unpack('>Q', f.read(8))[0]
+            header_size = 16
+        elif size == 0:
+            size = end - pos
+        if size < header_size:
+            return
+        yield box_type, pos + header_size, min(pos + size, end)
+        pos += size
+    if pos + 8 <= end:
+        raise _LimitExceeded('too many boxes')
+
+def _find_box(f, start, end, box_type):
+    for found, data_start, data_end in _iter_boxes(f, start, end):
+        if found == box_type:
+            return data_start, data_end
+    return None
+
+def _read(f, start, end, limit=512):
+    f.seek(start)
+    return f.read(min(end - start, limit))
+
+def _parse_time_header(data):
+    """解析 mvhd/mdhd，返回 (timescale, duration)。"""
+    if data[0] == 1:
+        return struct.unpack_from('>IQ', data, 20)
+    return struct.unpack_from('>II', data, 12)
+
+def _mp4a_codec(f, start, end):
+    """从 mp4a 采样描述内的 esds 读取 objectTypeIndication，区分 AAC 与 MP3。"""
+    esds = _find_box(f, start, end, b'esds')
+    if esds is None:
+        return None
+    data = _read(f, *esds)
+    pos = 4  # version/flags
+
+    def read_descriptor(pos):
+        tag = data[pos]
+        pos += 1
+        length = 0
+        for _ in range(4):
+            b = data[pos]
+            pos += 1
+            length = (length << 7) | (b & 0x7F)
+            if not b & 0x80:
+                break
+        return tag, pos
+
+    tag, pos = read_descriptor(pos)
+    if tag != 0x03:  # ES_Descriptor
+        return None
+    flags = data[pos + 2]
+    pos += 3
+    if flags & 0x80:
+        pos += 2
+    if flags & 0x40:
+        pos += 1 + data[pos]
+    if flags & 0x20:
+        pos += 2
+    tag, pos = read_descriptor(pos)
+    if tag != 0x04:  # DecoderConfigDescriptor
+        return None
+    return _MP4A_OBJECT_TYPES.get(data[pos])
+
+def _probe_mp4_track(f, start, end):
+    mdia = _find_box(f, start, end, b'mdia')
+    if mdia is None:
+        return None
+    hdlr = _find_box(f, *mdia, b'hdlr')
+    mdhd = _find_box(f, *mdia, b'mdhd')
+    if hdlr is None or mdhd is None:
+        return None
+    codec_type = _MP4_HANDLERS.get(_read(f, *hdlr)[8:12])
+    if codec_type is None:
+        # 字幕、hint 等轨道不影响分析结果，跳过
+        return {}
+
+    stbl = None
+    minf = _find_box(f, *mdia, b'minf')
+    if minf is not None:
+        stbl = _find_box(f, *minf, b'stbl')
+    stsd = _find_box(f, *stbl, b'stsd') if stbl is not None else None
+    if stsd is None:
+        return None
+    # stsd: version/flags(4) entry_count(4)，随后是第一个采样描述
+    entry_start = stsd[0] + 8
+    entry_size, fourcc = struct.unpack('>I4s', _read(f, entry_start, stsd[1], 8))
+    entry_end = min(entry_start + entry_size, stsd[1])
+    entry = _read(f, entry_start + 8, entry_end, 64)
+
+    timescale, duration = _parse_time_header(_read(f, *mdhd))
+    stream = {
+        'codec_type': codec_type,
+        'duration': duration / timescale if timescale else 0,
+    }
+    if codec_type == 'video':
+        stream['codec_name'] = _MP4_CODECS.get(fourcc)
+        stream['width'], stream['height'] = struct.unpack_from('>HH', entry, 24)
+    else:
+        version = struct.unpack_from('>H', entry, 8)[0]
+        if version > 1:
+            # QuickTime v2 声音描述字段布局不同，交给 FFprobe
+            return None
+        if fourcc == b'mp4a':
+            # 固定字段之后是子 box；QuickTime v1 声音描述多出 16 字节
+            children_start = entry_start + 36 + (16 if version == 1 else 0)
+            stream['codec_name'] = _mp4a_codec(f, children_start, entry_end)
+        else:
+            stream['codec_name'] = _MP4_CODECS.get(fourcc)
+        stream['channels'] = struct.unpack_from('>H', entry, 16)[0]
+        stream['sample_rate'] = str(struct.unpack_from('>I', entry, 24)[0] >> 16)
+    if stream['codec_name'] is None:
+        return None
+    return stream
+
+def _probe_mp4(f, size):
+    moov = _find_box(f, 0, size, b'moov')
+    if moov is None:
+        return None
+    mvhd = _find_box(f, *moov, b'mvhd')
+    if mvhd is None:
+        return None
+    timescale, duration = _parse_time_header(_read(f, *mvhd))
+    if not timescale:
+        return None
+
+    streams = []
+    for box_type, start, end in _iter_boxes(f, *moov):
+        if box_type != b'trak':
+            continue
+        stream = _probe_mp4_track(f, start, end)
+        if stream is None:
+            return None
+        if stream:
+            streams.append(stream)
+    return {
+        'format': {
+            'format_name': 'mov,mp4,m4a,3gp,3g2,mj2',
+            'duration': duration / timescale,
+        },
+        'streams': streams,
+    }
+
+# --- MKV / WebM ---
+
+def _read_vint(f, keep_marker=False):
+    """读取 EBML 变长整数，返回 (值, 是否为未知长度)。"""
+    first = f.read(1)[0]
+    length = 9 - first.bit_length()
+    if length > 8:
+        raise ValueError('invalid EBML varint')
+    value = first if keep_marker else first & ((1 << (8 - length)) - 1)
+    unknown = value == (1 << (8 - length)) - 1
+    for b in f.read(length - 1):
+        value = (value << 8) | b
+        unknown = unknown and b == 0xFF
+    return value, unknown and not keep_marker
+
+def _iter_elements(f, start, end):
+    """遍历 [start, end) 范围内的 EBML 元素，产出 (ID, 数据起点, 数据终点)。"""
+    pos = start
+    for _ in range(_MAX_CHILDREN):
+        if pos >= end:
+            return
+        f.seek(pos)
+        element_id, _ = _read_vint(f, keep_marker=True)
+        length, unknown = _read_vint(f)
+        data_start = f.tell()
+        data_end = end if unknown else min(data_start + length, end)
+        yield element_id, data_start, data_end
+        pos = data_end
+    if pos < end:
+        raise _LimitExceeded('too many elements')
+
+def _read_uint(f, start, end):
+    f.seek(start)
+    return int.from_bytes(f.read(end - start), 'big')
+
+def _read_float(f, start, end):
+    f.seek(start)
+    data = f.read(end - start)
+    return struct.unpack('>f' if len(data) == 4 else '>d', data)[0]
+
+def _probe_mkv_track(f, start, end):
+    track_type = codec_id = None
+    stream = {}
+    for element_id, data_start, data_end in _iter_elements(f, start, end):
+        if element_id == _TRACK_TYPE:
+            track_type = _read_uint(f, data_start, data_end)
+        elif element_id == _CODEC_ID:
+            f.seek(data_start)
+            codec_id = f.read(data_end - data_start).rstrip(b'\0').decode('ascii')
+        elif element_id == _VIDEO:
+            for child_id, child_start, child_end in _iter_elements(f, data_start, data_end):
+                if child_id == _PIXEL_WIDTH:
+                    stream['width'] = _read_uint(f, child_start, child_end)
+                elif child_id == _PIXEL_HEIGHT:
+                    stream['height'] = _read_uint(f, child_start, child_end)
+        elif element_id == _AUDIO:
+            stream['channels'] = 1  # Matroska 默认值
+            for child_id, child_start, child_end in _iter_elements(f, data_start, data_end):
+                if child_id == _CHANNELS:
+                    stream['channels'] = _read_uint(f, child_start, child_end)
+                elif child_id == _SAMPLING_FREQUENCY:
+                    stream['sample_rate'] = str(int(_read_float(f, child_start, child_end)))
+
+    codec_type = _MKV_TRACK_TYPES.get(track_type)
+    if codec_type is None:
+        return {}
+    # A_AAC/MPEG4/LC 等带 profile 后缀的写法也视为 AAC
+    codec_name = _MKV_CODECS.get(codec_id) or ('aac' if codec_id and codec_id.startswith('A_AAC') else None)
+    if codec_name is None:
+        return None
+    # 与 FFprobe 一致：Matroska 的流级别没有 duration 字段
+    stream.update(codec_type=codec_type, codec_name=codec_name)
+    return stream
+
+def _probe_mkv(f, size):
+    segment = None
+    for element_id, start, end in _iter_elements(f, 0, size):
+        if element_id == _SEGMENT:
+            segment = (start, end)
+            break
+    if segment is None:
+        return None
+
+    duration = None
+    timecode_scale = 1000000
+    streams = None
+    for element_id, start, end in _iter_elements(f, *segment):
+        if element_id == _INFO:
+            for child_id, child_start, child_end in _iter_elements(f, start, end):
+                if child_id == _TIMECODE_SCALE:
+                    timecode_scale = _read_uint(f, child_start, child_end)
+                elif child_id == _DURATION:
+                    duration = _read_float(f, child_start, child_end)
+        elif element_id == _TRACKS:
+            streams = []
+            for child_id, child_start, child_end in _iter_elements(f, start, end):
+                if child_id != _TRACK_ENTRY:
+                    continue
+                stream = _probe_mkv_track(f, child_start, child_end)
+                if stream is None:
+                    return None
+                if stream:
+                    streams.append(stream)
+        elif element_id == _CLUSTER:
+            # 已进入媒体数据，后面不会再有需要的头部信息
+            break
+        if duration is not None and streams is not None:
+            break
+
+    if duration is None or streams is None:
+        return None
+    return {
+        'format': {
+            'format_name': 'matroska,webm',
+            'duration': duration * timecode_scale / 1e9,
+        },
+        'streams': streams,
+    }
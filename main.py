@@ -1,19 +1,31 @@
 import os
+import asyncio
 import subprocess
-import json
 import logging
-from flask import Flask, request, jsonify, send_from_directory
+import shutil
+import hashlib
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+import orjson
+import msgspec
+from cachetools import LRUCache
+from quart import Quart, request, jsonify, send_from_directory
+from quart.json.provider import DefaultJSONProvider
+from werkzeug.exceptions import RequestEntityTooLarge
 from werkzeug.utils import secure_filename
-from dotenv import load_dotenv
-from flask_cors import CORS # 导入 CORS
+from streaming_form_data import StreamingFormDataParser
+from streaming_form_data.parser import ParseFailedException
+from streaming_form_data.targets import BaseTarget
+from container_probe import probe_container
 
 # --- 配置日志 ---
 def setup_logging():
-    # 移除Flask默认的日志处理程序，防止重复输出
+    # 移除Quart默认的日志处理程序，防止重复输出
     for handler in app.logger.handlers:
         app.logger.removeHandler(handler)
 
-    # 根日志记录器（Flask 使用）
+    # 根日志记录器（Quart 使用）
     logging.basicConfig(
         level=logging.INFO, # 设置日志级别为 INFO
         format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
@@ -23,13 +35,24 @@ def setup_logging():
     # 为应用 logger 设置 INFO 级别
     app.logger.setLevel(logging.INFO)
 
-load_dotenv()
+class OrjsonProvider(DefaultJSONProvider):
+    """基于 orjson 的 JSON 编解码，替代标准库 json（直接输出 UTF-8）。"""
 
-app = Flask(__name__)
+    def dumps(self, obj, **kwargs):
+        return orjson.dumps(obj, option=orjson.OPT_NON_STR_KEYS).decode()
+
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
+app = Quart(__name__)
+app.json = OrjsonProvider(app)
 #调用日志配置函数
 setup_logging()
-# 启用 CORS，允许所有来源访问所有路由
-CORS(app) 
+# ENABLE_CORS 为 1/true/yes 时才启用 CORS（允许所有来源访问所有路由），未启用时不导入 quart_cors
+# 环境变量由部署方提供（docker --env-file、systemd 等），不再在启动时读取 .env 文件
+if os.environ.get('ENABLE_CORS', '').strip().lower() in ('1', 'true', 'yes'):
+    from quart_cors import cors
+    app = cors(app)
 
 # 配置上传文件夹，使用 /tmp 是 Docker 容器内的临时且安全的位置
 UPLOAD_FOLDER = '/tmp/uploads'
@@ -37,47 +60,223 @@ UPLOAD_FOLDER = '/tmp/uploads'
 os.makedirs(UPLOAD_FOLDER, exist_ok=True) 
 
 app.config['UPLOAD_FOLDER'] = UPLOAD_FOLDER
-app.config['MAX_CONTENT_LENGTH'] = 100 * 1024 * 1024  # 最大 100MB
+# 最大 100MB；请求体由 streaming-form-data 解析，在接收循环中手动校验大小
+app.config['MAX_CONTENT_LENGTH'] = 100 * 1024 * 1024
+# 部署在 nginx 之后时，可让 nginx 把请求体写入磁盘并通过 X-File 头告知路径，应用直接读取该文件：
+#   client_body_in_file_only clean;
+#   client_body_temp_path /var/lib/nginx/body;
+#   proxy_set_header X-File $request_body_file;
+#   proxy_pass_request_body off;
+#   proxy_set_header Content-Length "";
+# 只有设置了 NGINX_BODY_DIR 且 X-File 指向该目录内的文件时才会采信，避免客户端伪造请求头读取任意文件
+NGINX_BODY_DIR = os.path.realpath(os.environ['NGINX_BODY_DIR']) if os.environ.get('NGINX_BODY_DIR') else None
+# 上传内容在内存中缓冲的上限，超过后自动转存到 UPLOAD_FOLDER 下的临时文件
+SPOOL_MAX_SIZE = 16 * 1024 * 1024
+
+# FFprobe 单次执行的超时时间（秒），超时后强制结束子进程
+FFPROBE_TIMEOUT = float(os.environ.get('FFPROBE_TIMEOUT', 60))
+# 只请求报告用到的字段，FFprobe 不再输出 tags、disposition 等无关信息
+FFPROBE_ENTRIES = (
+    'format=filename,duration,size,format_name,bit_rate'
+    ':stream=codec_type,codec_name,width,height,avg_frame_rate,codec_tag_string,'
+    'sample_rate,channels,channel_layout,start_time,duration'
+)
+# 只需容器级元数据，限制 FFprobe 探测时读取的数据量（字节）和时长（微秒）
+FFPROBE_PROBESIZE = os.environ.get('FFPROBE_PROBESIZE', '262144')
+FFPROBE_ANALYZEDURATION = os.environ.get('FFPROBE_ANALYZEDURATION', '500000')
+# 同时运行的 FFprobe 子进程上限（每个 worker 进程），避免大量并发上传时 CPU 过载。
+# 信号量在每个 hypercorn worker 内独立生效，整机的真实上限是 WORKERS × FFPROBE_CONCURRENCY，
+# 因此默认按 worker 数均分 CPU 核心数（WORKERS 由 Dockerfile 导出，单进程运行时为 1）
+WORKERS = int(os.environ.get('WORKERS', 1))
+FFPROBE_CONCURRENCY = int(os.environ.get('FFPROBE_CONCURRENCY', max(1, (os.cpu_count() or 1) // WORKERS)))
+FFPROBE_SEM = asyncio.Semaphore(FFPROBE_CONCURRENCY)
+# 通过管道向 FFprobe 写入上传内容时的分块大小
+PIPE_CHUNK_SIZE = 1024 * 1024
+# 磁盘文件之间复制、读取大文件时的缓冲区大小，减少 read/write 系统调用次数
+COPY_BUFSIZE = 4 * 1024 * 1024
+# FFprobe 可执行文件路径：启动时解析一次，之后启动子进程无需再搜索 PATH
+FFPROBE_BIN = shutil.which('ffprobe') or 'ffprobe'
+
+# /ping 缓存的 FFprobe 检查结果的有效期（秒）
+FFPROBE_CHECK_TTL = float(os.environ.get('FFPROBE_CHECK_TTL', 60))
+
+def check_ffprobe():
+    """执行 `ffprobe -version`，检查 FFprobe 是否可用。"""
+    try:
+        # 只关心退出码，版本信息直接丢弃，不做捕获和解码
+        subprocess.run(
+            [FFPROBE_BIN, '-version'],
+            check=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, timeout=2,
+        )
+        return True
+    except (OSError, subprocess.SubprocessError):
+        return False
+
+# 导入时检查一次，/ping 直接返回缓存结果，过期后才重新检查
+FFPROBE_AVAILABLE = check_ffprobe()
+_ffprobe_checked_at = time.monotonic()
+
+# 分析结果缓存：按上传内容的 SHA-256 索引，重复上传同一文件时直接返回报告（每个 worker 进程独立）
+_CACHE = LRUCache(maxsize=int(os.environ.get('ANALYSIS_CACHE_SIZE', 1024)))
+
+# 执行阻塞文件读写的共享线程池，避免磁盘 I/O 卡住事件循环
+_EXEC = ThreadPoolExecutor(max_workers=int(os.environ.get('IO_WORKERS', 8)))
+
+# --- FFprobe 输出结构 ---
+# 只声明报告用到的字段，其余字段解码时直接忽略；
+# 以 strict=False 解码，FFprobe 以字符串输出的数值（duration、bit_rate 等）会直接转换为 int/float
+
+class FfprobeStream(msgspec.Struct):
+    codec_type: str = ''
+    codec_name: str = 'N/A'
+    width: int | str = 'N/A'
+    height: int | str = 'N/A'
+    channels: int | str = 'N/A'
+    duration: float = 0.0
+
+class FfprobeFormat(msgspec.Struct):
+    format_name: str = 'N/A'
+    duration: float = 0.0
+    bit_rate: int = 0
+
+class FfprobeOutput(msgspec.Struct):
+    streams: list[FfprobeStream] = []
+    format: FfprobeFormat = msgspec.field(default_factory=FfprobeFormat)
+
+_FFPROBE_DECODER = msgspec.json.Decoder(FfprobeOutput, strict=False)
 
 # --- FFprobe 核心函数 ---
 
-def analyze_video(filepath):
-    """使用 FFprobe 分析视频文件，返回音视频同步、码率等信息。"""
+async def _feed_stdin(proc, stream):
+    """把上传内容分块写入 FFprobe 的标准输入。"""
+    loop = asyncio.get_running_loop()
     try:
-        # FFprobe 命令：静默模式，JSON格式输出，显示流信息
-        command = [
-            'ffprobe',
-            '-v', 'quiet',
-            '-print_format', 'json',
-            '-show_streams',
-            '-show_format',
-            filepath
-        ]
-        
-        # 执行命令并捕获输出
-        result = subprocess.run(command, capture_output=True, text=True, check=True)
-        data = json.loads(result.stdout)
+        while True:
+            # 缓冲区超过 SPOOL_MAX_SIZE 后位于磁盘上，读取交给线程池
+            chunk = await loop.run_in_executor(_EXEC, stream.read, PIPE_CHUNK_SIZE)
+            if not chunk:
+                break
+            proc.stdin.write(chunk)
+            await proc.stdin.drain()
+    except (BrokenPipeError, ConnectionResetError):
+        # FFprobe 读到足够的头部信息后会提前关闭管道，属于正常情况
+        pass
+    finally:
+        proc.stdin.close()
+
+async def run_ffprobe(filepath, stream=None, limit_probe=False):
+    """异步执行 FFprobe，返回解码后的 FfprobeOutput。
+
+    子进程运行期间不会阻塞事件循环，其他请求可以并发处理。
+    传入 stream 时 filepath 应为 'pipe:0'，上传内容经标准输入直接交给 FFprobe，无需落盘。
+    limit_probe 为 True 时按 FFPROBE_PROBESIZE / FFPROBE_ANALYZEDURATION 限制探测范围。
+    失败时抛出 subprocess.CalledProcessError，超时抛出 subprocess.TimeoutExpired。
+    """
+    # FFprobe 命令：静默模式，JSON格式输出，仅显示所需的格式与流字段
+    command = [
+        FFPROBE_BIN,
+        '-v', 'quiet',
+        '-print_format', 'json',
+        '-show_entries', FFPROBE_ENTRIES,
+    ]
+    if limit_probe:
+        command += ['-probesize', FFPROBE_PROBESIZE, '-analyzeduration', FFPROBE_ANALYZEDURATION]
+    command.append(filepath)
+
+    # 超出并发上限时在此排队，超时时间从子进程真正启动后开始计算
+    async with FFPROBE_SEM:
+        proc = await asyncio.create_subprocess_exec(
+            *command,
+            stdin=asyncio.subprocess.PIPE if stream is not None else None,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE,
+        )
+
+        async def communicate():
+            if stream is None:
+                return await proc.communicate()
+            # 写入标准输入的同时读取输出，避免双方互相等待管道缓冲区
+            _, (stdout, stderr) = await asyncio.gather(_feed_stdin(proc, stream), proc.communicate())
+            return stdout, stderr
+
+        try:
+            stdout, stderr = await asyncio.wait_for(communicate(), timeout=FFPROBE_TIMEOUT)
+        except asyncio.TimeoutError:
+            # 超时：结束子进程并回收，避免留下僵尸进程
+            proc.kill()
+            await proc.wait()
+            raise subprocess.TimeoutExpired(command, FFPROBE_TIMEOUT)
+
+    if proc.returncode != 0:
+        raise subprocess.CalledProcessError(proc.returncode, command, output=stdout, stderr=stderr)
+    return _FFPROBE_DECODER.decode(stdout)
+
+def _streams_complete(data):
+    """检查 FFprobe 是否识别出了音视频流的编码（以及视频流的分辨率）。
+
+    数据流、附件流（如 tmcd、gpmd）本身没有 codec_name，不参与判断。
+    """
+    streams = [s for s in data.streams if s.codec_type in ('video', 'audio')]
+    return bool(streams) and all(
+        s.codec_name != 'N/A' and (s.codec_type != 'video' or s.width != 'N/A')
+        for s in streams
+    )
+
+async def probe_with_ffprobe(filepath, stream=None):
+    """先限制探测范围快速执行 FFprobe；失败或流信息不完整时（少见）再完整探测一次。"""
+    try:
+        data = await run_ffprobe(filepath, stream, limit_probe=True)
+        if _streams_complete(data):
+            return data
+    except subprocess.CalledProcessError:
+        pass
+    app.logger.info("Limited FFprobe probe was incomplete, retrying with default probesize.")
+    if stream is not None:
+        stream.seek(0)
+    return await run_ffprobe(filepath, stream)
+
+async def analyze_video(filepath, stream=None):
+    """使用 FFprobe 分析视频文件，返回音视频同步、码率等信息。
+
+    stream 为可 seek 的文件对象，用于解析容器头部；filepath 为 'pipe:0' 时它同时作为 FFprobe 的标准输入。
+    """
+    try:
+        data = None
+        if stream is not None:
+            # 常见的 MP4/MKV 直接解析容器头部，无法识别时才启动 FFprobe
+            header = await asyncio.get_running_loop().run_in_executor(_EXEC, probe_container, stream)
+            stream.seek(0)
+            if header is not None:
+                data = msgspec.convert(header, FfprobeOutput, strict=False)
+        if data is None:
+            data = await probe_with_ffprobe(filepath, stream if filepath == 'pipe:0' else None)
         
-        # 提取关键信息
-        video_stream = next((s for s in data.get('streams', []) if s.get('codec_type') == 'video'), None)
-        audio_stream = next((s for s in data.get('streams', []) if s.get('codec_type') == 'audio'), None)
+        # 提取关键信息：一次遍历同时找到第一条视频流和音频流
+        video_stream = audio_stream = None
+        for s in data.streams:
+            if s.codec_type == 'video' and video_stream is None:
+                video_stream = s
+            elif s.codec_type == 'audio' and audio_stream is None:
+                audio_stream = s
+            if video_stream is not None and audio_stream is not None:
+                break
 
         report = {
             "status": "Success",
             "metadata": {
-                "format_name": data.get('format', {}).get('format_name', 'N/A'),
-                "duration": float(data.get('format', {}).get('duration', 0)),
-                "bit_rate": int(data.get('format', {}).get('bit_rate', 0)),
+                "format_name": data.format.format_name,
+                "duration": data.format.duration,
+                "bit_rate": data.format.bit_rate,
             },
             "video_stream": {
-                "codec": video_stream.get('codec_name', 'N/A') if video_stream else 'N/A',
-                "resolution": f"{video_stream.get('width', 'N/A')}x{video_stream.get('height', 'N/A')}" if video_stream else 'N/A',
-                "duration": float(video_stream.get('duration', 0)) if video_stream and video_stream.get('duration') else 0,
+                "codec": video_stream.codec_name if video_stream else 'N/A',
+                "resolution": f"{video_stream.width}x{video_stream.height}" if video_stream else 'N/A',
+                "duration": video_stream.duration if video_stream else 0,
             },
             "audio_stream": {
-                "codec": audio_stream.get('codec_name', 'N/A') if audio_stream else 'N/A',
-                "channels": audio_stream.get('channels', 'N/A') if audio_stream else 'N/A',
-                "duration": float(audio_stream.get('duration', 0)) if audio_stream and audio_stream.get('duration') else 0,
+                "codec": audio_stream.codec_name if audio_stream else 'N/A',
+                "channels": audio_stream.channels if audio_stream else 'N/A',
+                "duration": audio_stream.duration if audio_stream else 0,
             },
             "sync_check": "N/A",
             "sync_details": {}
@@ -105,7 +304,14 @@ def analyze_video(filepath):
         return {
             "status": "FFprobe Error",
             "message": "FFprobe command failed to execute.",
-            "error_details": e.stderr.strip()
+            "error_details": e.stderr.decode('utf-8', 'replace').strip()
+        }
+    except subprocess.TimeoutExpired as e:
+        # FFprobe 执行超时：单独的状态，重试（回退到临时文件）只会再耗费一个超时周期
+        return {
+            "status": "FFprobe Timeout",
+            "message": f"FFprobe timed out after {e.timeout} seconds.",
+            "error_details": ""
         }
     except Exception as e:
         # 其他 Python 错误
@@ -114,55 +320,173 @@ def analyze_video(filepath):
             "message": str(e)
         }
 
+def report_response(report):
+    """根据分析报告的状态生成 JSON 响应。"""
+    if report.get('status') in ('Success', 'FFprobe Error', 'FFprobe Timeout'):
+        # 即使 FFprobe 报错，也返回 JSON 报告（状态码 200 或 500 取决于您对 FFprobe 错误的定义）
+        return jsonify(report), 200
+    else:
+        return jsonify(report), 500 # 其他服务器内部错误
+
+# --- 上传接收 ---
+
+def nginx_body_file():
+    """返回 nginx 已写入磁盘的请求体路径（X-File 头）；未启用或路径不可信时返回 None。"""
+    path = request.headers.get('X-File')
+    if not path or NGINX_BODY_DIR is None:
+        return None
+    path = os.path.realpath(path)
+    if os.path.commonpath([path, NGINX_BODY_DIR]) != NGINX_BODY_DIR or not os.path.isfile(path):
+        app.logger.warning(f"Ignoring untrusted X-File header: {path}")
+        return None
+    return path
+
+async def iter_file(path):
+    """按 COPY_BUFSIZE 异步分块读取文件，读取在线程池中执行。"""
+    loop = asyncio.get_running_loop()
+    with open(path, 'rb') as f:
+        fadvise = getattr(os, 'posix_fadvise', None)
+        if fadvise:
+            # 顺序读取，提示内核加大预读
+            fadvise(f.fileno(), 0, 0, os.POSIX_FADV_SEQUENTIAL)
+        while chunk := await loop.run_in_executor(_EXEC, f.read, COPY_BUFSIZE):
+            yield chunk
+        if fadvise:
+            # 文件只读一次，读完后释放其页缓存，避免挤占其他数据
+            fadvise(f.fileno(), 0, 0, os.POSIX_FADV_DONTNEED)
+
+async def analyze_body_file(path):
+    """分析 nginx 落盘的原始视频请求体：文件已在磁盘上，直接交给容器解析与 FFprobe，不复制任何数据。
+
+    该文件由 nginx 负责清理。
+    """
+    # nginx 会清空 Content-Length，因此在这里按文件大小检查
+    if os.path.getsize(path) > app.config['MAX_CONTENT_LENGTH']:
+        return jsonify({"status": "error", "message": "File exceeds the maximum upload size"}), 413
+    with open(path, 'rb') as f:
+        analysis_report = await analyze_video(path, stream=f)
+    return report_response(analysis_report)
+
+def save_stream(stream, filename):
+    """把上传缓冲区写入 UPLOAD_FOLDER 下唯一命名的临时文件并返回其路径（阻塞调用，应在线程池中执行）。"""
+    stream.seek(0)
+    # NamedTemporaryFile 以 O_EXCL 创建文件，同名文件并发上传也不会互相覆盖
+    # 只保留（截断后的）扩展名，过长的原文件名会超出文件系统的文件名长度限制
+    suffix = os.path.splitext(secure_filename(filename))[1][:16]
+    with tempfile.NamedTemporaryFile(dir=UPLOAD_FOLDER, suffix=suffix, delete=False) as dst:
+        try:
+            shutil.copyfileobj(stream, dst, COPY_BUFSIZE)
+        except Exception:
+            os.unlink(dst.name)
+            raise
+    return dst.name
+
+class UploadTarget(BaseTarget):
+    """streaming-form-data 的接收目标：把 file 字段的内容写入可 seek 的缓冲区，同时计算 SHA-256。"""
+
+    def __init__(self):
+        super().__init__()
+        self.started = False
+        self.stream = tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_SIZE, dir=UPLOAD_FOLDER)
+        self.hash = hashlib.sha256()
+
+    def on_start(self):
+        self.started = True
+
+    def on_data_received(self, chunk):
+        self.stream.write(chunk)
+        self.hash.update(chunk)
+
 # --- 路由 ---
 
+@app.before_request
+async def preflight():
+    """在读取请求体之前拒绝超大的上传，避免白白接收整个请求体。"""
+    if request.endpoint != 'analyze':
+        return None
+    if (request.content_length or 0) > app.config['MAX_CONTENT_LENGTH']:
+        return jsonify({"status": "error", "message": "File exceeds the maximum upload size"}), 413
+    return None
+
 @app.route('/', methods=['GET'])
-def serve_index():
+async def serve_index():
     """根路由：托管并返回index.html页面"""
-    # Flask会自动返回index.html
+    # Quart会自动返回index.html
     app.logger.info("Sending index.html to client.")
-    return send_from_directory('static', 'index.html')
+    return await send_from_directory('static', 'index.html')
 
 @app.route('/ping', methods=['GET'])
-def ping():
+async def ping():
     """健康检查接口，检查 FFprobe 是否可用"""
+    global FFPROBE_AVAILABLE, _ffprobe_checked_at
     app.logger.info("Received /ping request.")
-    try:
-        subprocess.run(['ffprobe', '-version'], check=True, capture_output=True)
-        return jsonify({"status": "ok", "message": "FFprobe is installed and Flask is running."}), 200
-    except subprocess.CalledProcessError:
+    if time.monotonic() - _ffprobe_checked_at > FFPROBE_CHECK_TTL:
+        # 先更新时间戳，避免并发的 /ping 同时触发检查
+        _ffprobe_checked_at = time.monotonic()
+        FFPROBE_AVAILABLE = await asyncio.to_thread(check_ffprobe)
+    if not FFPROBE_AVAILABLE:
         return jsonify({"status": "error", "message": "FFprobe is not accessible."}), 500
-    except Exception as e:
-        return jsonify({"status": "error", "message": f"Server error: {str(e)}"}), 500
+    return jsonify({"status": "ok", "message": "FFprobe is installed and Quart is running."}), 200
 
 
 @app.route('/analyze', methods=['POST'])
-def analyze():
+async def analyze():
     app.logger.info("Received /analyze request.")
-    # 1. 检查是否有文件上传
-    if 'file' not in request.files:
-        return jsonify({"status": "error", "message": "No file part in the request"}), 400
-    
-    file = request.files['file']
-    if file.filename == '':
-        return jsonify({"status": "error", "message": "No selected file"}), 400
+    # nginx 已把请求体写入磁盘时直接读取该文件；原始视频请求体无需任何复制即可分析
+    body_file = nginx_body_file()
+    if body_file is not None and request.mimetype != 'multipart/form-data':
+        return await analyze_body_file(body_file)
 
+    target = UploadTarget()
     temp_filepath = None
     try:
-        # 2. 安全保存文件到临时路径
-        filename = secure_filename(file.filename)
-        temp_filepath = os.path.join(app.config['UPLOAD_FOLDER'], filename)
-        file.save(temp_filepath)
-        
-        # 3. 调用核心分析函数
-        analysis_report = analyze_video(temp_filepath)
+        # 1. 边接收边解析 multipart 请求体，不经过 request.files
+        try:
+            parser = StreamingFormDataParser(headers=request.headers)
+            parser.register('file', target)
+            received = 0
+            loop = asyncio.get_running_loop()
+            body = iter_file(body_file) if body_file is not None else request.body
+            async for chunk in body:
+                received += len(chunk)
+                if received > app.config['MAX_CONTENT_LENGTH']:
+                    return jsonify({"status": "error", "message": "File exceeds the maximum upload size"}), 413
+                # 解析并写入上传缓冲区：超过 SPOOL_MAX_SIZE 后是磁盘写入，交给线程池
+                await loop.run_in_executor(_EXEC, parser.data_received, chunk)
+        except RequestEntityTooLarge:
+            # Quart 的 Body 自身也会按 MAX_CONTENT_LENGTH 检查缓冲的数据量，超限时在迭代中抛出
+            return jsonify({"status": "error", "message": "File exceeds the maximum upload size"}), 413
+        except (ParseFailedException, ValueError) as e:
+            return jsonify({"status": "error", "message": f"Malformed multipart request: {str(e)}"}), 400
+
+        # 检查是否有文件上传
+        if not target.started:
+            return jsonify({"status": "error", "message": "No file part in the request"}), 400
+        if not target.multipart_filename:
+            return jsonify({"status": "error", "message": "No selected file"}), 400
+
+        # 同一内容已分析过则直接返回缓存的报告
+        cache_key = target.hash.digest()
+        cached_report = _CACHE.get(cache_key)
+        if cached_report is not None:
+            app.logger.info("Returning cached analysis report.")
+            return jsonify(cached_report), 200
+
+        # 2. 调用核心分析函数：优先解析容器头部，否则通过管道直接交给 FFprobe，不写临时文件
+        target.stream.seek(0)
+        analysis_report = await analyze_video('pipe:0', stream=target.stream)
+
+        # 3. 管道无法 seek，moov 位于文件末尾的 MP4 等可能解析失败，此时回退到临时文件（超时不回退）
+        if analysis_report.get('status') == 'FFprobe Error':
+            app.logger.info("FFprobe failed on piped input, falling back to temp file.")
+            temp_filepath = await asyncio.get_running_loop().run_in_executor(
+                _EXEC, save_stream, target.stream, target.multipart_filename)
+            analysis_report = await analyze_video(temp_filepath)
         
-        # 4. 返回 JSON 报告
-        if analysis_report.get('status') == 'Success' or analysis_report.get('status') == 'FFprobe Error':
-            # 即使 FFprobe 报错，也返回 JSON 报告（状态码 200 或 500 取决于您对 FFprobe 错误的定义）
-            return jsonify(analysis_report), 200
-        else:
-            return jsonify(analysis_report), 500 # 其他服务器内部错误
+        # 4. 返回 JSON 报告（仅缓存成功的结果）
+        if analysis_report.get('status') == 'Success':
+            _CACHE[cache_key] = analysis_report
+        return report_response(analysis_report)
 
     except Exception as e:
         # 捕获文件保存或任何未预料到的错误
@@ -172,15 +496,23 @@ def analyze():
             "message": f"An unexpected error occurred during file processing: {str(e)}"
         }), 500
     finally:
-        # 5. 确保删除临时文件
-        if temp_filepath and os.path.exists(temp_filepath):
+        # 5. 确保释放上传缓冲区并删除临时文件
+        target.stream.close()
+        if temp_filepath:
             try:
                 os.remove(temp_filepath)
                 # app.logger.info(f"Cleaned up file: {temp_filepath}") # 生产环境中可以启用日志
-            except Exception as e:
+            except OSError as e:
                 # app.logger.error(f"Error cleaning up file: {e}")
                 pass # 忽略清理错误
 
 if __name__ == '__main__':
-    # 容器环境通常不设置 debug=True
+    # Quart 自带的开发服务器只适合本地调试，生产环境请使用 ASGI 服务器（见 Dockerfile）：
+    #   hypercorn -w $(nproc) -b 0.0.0.0:8080 main:app
+    if os.environ.get('APP_ENV') != 'development':
+        raise SystemExit(
+            "Refusing to start the development server. "
+            "Run 'hypercorn -w $(nproc) -b 0.0.0.0:8080 main:app', "
+            "or set APP_ENV=development for local debugging."
+        )
     app.run(debug=False, host='0.0.0.0', port=8080)
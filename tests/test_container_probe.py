@@ -0,0 +1,150 @@
+import io
+import struct
+import time
+
+from container_probe import probe_container
+
+# --- 构造测试用的 MP4 (ISO BMFF) ---
+
+def box(box_type, payload):
+    return struct.pack('>I4s', 8 + len(payload), box_type) + payload
+
+def full_box(box_type, payload, version=0):
+    return box(box_type, bytes([version, 0, 0, 0]) + payload)
+
+def time_header(box_type, timescale, duration, version=0):
+    if version == 1:
+        payload = struct.pack('>QQIQ', 0, 0, timescale, duration)
+    else:
+        payload = struct.pack('>IIII', 0, 0, timescale, duration)
+    return full_box(box_type, payload + b'\0' * 80, version)
+
+def hdlr(handler):
+    return full_box(b'hdlr', b'\0' * 4 + handler + b'\0' * 13)
+
+def visual_entry(fourcc, width, height):
+    return box(fourcc, b'\0' * 6 + b'\0\x01' + b'\0' * 16 + struct.pack('>HH', width, height) + b'\0' * 50)
+
+def esds(object_type):
+    # ES_Descriptor(0x03) -> DecoderConfigDescriptor(0x04) -> objectTypeIndication
+    return full_box(b'esds', bytes([0x03, 0x19, 0x00, 0x01, 0x00, 0x04, 0x11, object_type]) + b'\0' * 20)
+
+def audio_entry(fourcc, channels, sample_rate, children=b''):
+    return box(fourcc, b'\0' * 6 + b'\0\x01' + b'\0' * 8
+               + struct.pack('>HHHHI', channels, 16, 0, 0, sample_rate << 16) + children)
+
+def trak(handler, timescale, duration, entry, mdhd_version=0):
+    stsd = full_box(b'stsd', struct.pack('>I', 1) + entry)
+    mdia = box(b'mdia', time_header(b'mdhd', timescale, duration, mdhd_version) + hdlr(handler)
+               + box(b'minf', box(b'stbl', stsd)))
+    return box(b'trak', mdia)
+
+def build_mp4(moov_at_end=False, mdhd_version=0, audio_object_type=0x40):
+    moov = box(b'moov', time_header(b'mvhd', 1000, 10000)
+               + trak(b'vide', 90000, 900000, visual_entry(b'avc1', 1920, 1080), mdhd_version)
+               + trak(b'soun', 48000, 480000, audio_entry(b'mp4a', 2, 48000, esds(audio_object_type)), mdhd_version))
+    ftyp = box(b'ftyp', b'isom\0\0\0\0')
+    mdat = box(b'mdat', b'\0' * 4096)
+    return ftyp + mdat + moov if moov_at_end else ftyp + moov + mdat
+
+# --- 构造测试用的 Matroska (EBML) ---
+
+def element(element_id, payload):
+    id_bytes = element_id.to_bytes((element_id.bit_length() + 7) // 8, 'big')
+    # 8 字节长度的 EBML varint
+    return id_bytes + b'\x01' + len(payload).to_bytes(7, 'big') + payload
+
+def uint_element(element_id, value):
+    return element(element_id, value.to_bytes(4, 'big'))
+
+def build_mkv(video_codec=b'V_VP9'):
+    info = element(0x1549A966, uint_element(0x2AD7B1, 1000000) + element(0x4489, struct.pack('>d', 12500.0)))
+    video = element(0xAE, uint_element(0x83, 1) + element(0x86, video_codec)
+                    + element(0xE0, uint_element(0xB0, 1280) + uint_element(0xBA, 720)))
+    audio = element(0xAE, uint_element(0x83, 2) + element(0x86, b'A_OPUS')
+                    + element(0xE1, uint_element(0x9F, 2) + element(0xB5, struct.pack('>f', 48000.0))))
+    tracks = element(0x1654AE6B, video + audio)
+    # 未知长度的 Segment（长度字段全为 1）
+    segment = bytes.fromhex('18538067') + b'\x01' + b'\xff' * 7 + info + tracks + element(0x1F43B675, b'\0' * 1024)
+    return element(0x1A45DFA3, element(0x4282, b'webm')) + segment
+
+def probe(data):
+    return probe_container(io.BytesIO(data))
+
+# --- MP4 ---
+
+def test_mp4_faststart():
+    data = build_mp4()
+    assert probe(data) == {
+        'format': {
+            'format_name': 'mov,mp4,m4a,3gp,3g2,mj2',
+            'duration': 10.0,
+            'size': len(data),
+            'bit_rate': int(len(data) * 8 / 10.0),
+        },
+        'streams': [
+            {'codec_type': 'video', 'duration': 10.0, 'codec_name': 'h264', 'width': 1920, 'height': 1080},
+            {'codec_type': 'audio', 'duration': 10.0, 'codec_name': 'aac', 'channels': 2, 'sample_rate': '48000'},
+        ],
+    }
+
+def test_mp4_moov_at_end():
+    assert probe(build_mp4(moov_at_end=True))['streams'] == probe(build_mp4())['streams']
+
+def test_mp4_mdhd_version_1():
+    assert probe(build_mp4(mdhd_version=1))['streams'] == probe(build_mp4())['streams']
+
+def test_mp4_esds_mp3():
+    assert probe(build_mp4(audio_object_type=0x6B))['streams'][1]['codec_name'] == 'mp3'
+
+def test_mp4_unknown_audio_object_type():
+    assert probe(build_mp4(audio_object_type=0x20)) is None
+
+def test_mp4_truncated():
+    data = build_mp4(moov_at_end=True)
+    assert probe(data[:len(data) - 100]) is None
+
+# --- Matroska ---
+
+def test_mkv_unknown_size_segment():
+    data = build_mkv()
+    assert probe(data) == {
+        'format': {
+            'format_name': 'matroska,webm',
+            'duration': 12.5,
+            'size': len(data),
+            'bit_rate': int(len(data) * 8 / 12.5),
+        },
+        'streams': [
+            {'width': 1280, 'height': 720, 'codec_type': 'video', 'codec_name': 'vp9'},
+            {'channels': 2, 'sample_rate': '48000', 'codec_type': 'audio', 'codec_name': 'opus'},
+        ],
+    }
+
+def test_mkv_unknown_codec():
+    assert probe(build_mkv(video_codec=b'V_THEORA')) is None
+
+def test_mkv_truncated():
+    assert probe(build_mkv()[:60]) is None
+
+# --- 无法识别的输入 ---
+
+def test_unknown_input():
+    assert probe(b'') is None
+    assert probe(b'garbage' * 100) is None
+
+# --- 恶意输入：大量极小的 box/元素 ---
+
+def test_mp4_many_tiny_boxes():
+    data = box(b'ftyp', b'isom\0\0\0\0') + box(b'free', b'') * (10 * 1024 * 1024 // 8) + build_mp4()[16:]
+    started = time.monotonic()
+    assert probe(data) is None
+    assert time.monotonic() - started < 1
+
+def test_mkv_many_tiny_elements():
+    # 大量 2 字节的 EBML Void 元素，Info/Tracks 位于其后
+    header = element(0x1A45DFA3, element(0x4282, b'webm'))
+    segment = bytes.fromhex('18538067') + b'\x01' + b'\xff' * 7 + b'\xec\x80' * (5 * 1024 * 1024)
+    started = time.monotonic()
+    assert probe(header + segment + build_mkv()[len(header) + 12:]) is None
+    assert time.monotonic() - started < 1